@@ -1,33 +1,34 @@
-import subprocess
+from pathlib import Path
+import sys
+
+sys.path.insert(0, str(Path(__file__).parent / "src"))
+
+import compressors as comp
+import features as feat
+from sweep import run_sweep
+
+RESULTS_PATH = Path("results") / "sweep.csv"
+
+
+def run_experiment():
+    # Run with e.g. "py -m cProfile -o sweep.prof experiment.py" to profile the whole sweep
+    results = run_sweep(
+        num_dirs=[5],
+        num_files=[200],
+        compressors=[comp.comp_bzip2, comp.comp_gzip, comp.comp_zlib, comp.comp_zstd, comp.comp_zstandard],
+        metrics=["NCD", "COS", "JAC"],
+        schemes=["bm", "ha", "knn10"],
+        num_classification_files=(5, 100, 100),
+        features=[feat.feat_tokens, feat.feat_bytes],
+    )
+    print(results.to_string(index=False))
+    RESULTS_PATH.parent.mkdir(parents=True, exist_ok=True)
+    results.to_csv(RESULTS_PATH, index=False)
+    print(f"Results saved to {RESULTS_PATH}")
 
-def run_commands():
-    commands = [
-        # "py -m cProfile -o HeatFscores.prof src/main.py 5 300 -c bzip2 gzip zlib zstd zstandard -NCD -PH -PF",
-        "py -m cProfile -o classify.prof src/main.py 5 200 -c bzip2 gzip -NCD -CLFY -ncf 100 -cs bm -PC",
-        "py -m cProfile -o classify.prof src/main.py 5 200 -c zlib zstd zstandard -NCD -CLFY -ncf 100 -cs bm -PC",
-        "py -m cProfile -o classify.prof src/main.py 5 200 -c bzip2 gzip -NCD -CLFY -ncf 100 -cs ha -PC",
-        "py -m cProfile -o classify.prof src/main.py 5 200 -c zlib zstd zstandard -NCD -CLFY -ncf 100 -cs ha -PC",
-        "py -m cProfile -o classify.prof src/main.py 5 200 -c bzip2 gzip -NCD -CLFY -ncf 100 -cs knn10 -PC",
-        "py -m cProfile -o classify.prof src/main.py 5 200 -c zlib zstd zstandard -NCD -CLFY -ncf 100 -cs knn10 -PC"
-    ]
-    
-    processes = []
-    for i, cmd in enumerate(commands):
-        print("Running command with id=%d: %s" % (i, cmd))
-        process = subprocess.Popen(cmd.split())
-        processes.append(process)
-    
-    for process in processes:
-        process.wait()
-        if process.returncode == 0:
-            print("Command succeeded\n")
-        else:
-            print("Command failed\n")
 
 if __name__ == "__main__":
     try:
-        run_commands()
+        run_experiment()
     except KeyboardInterrupt:
         print("Process interrupted by user.")
-    except Exception as e:
-        print(f"An error occurred: {e}")
\ No newline at end of file
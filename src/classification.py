@@ -1,26 +1,71 @@
 from collections import defaultdict
+from functools import partial
+from typing import Literal
+import concurrent.futures
 
 import data
-from similarity import sim_C_NCD_single, get_tool_label
+from similarity import compute_complengths, sim_C_NCD_single, sim_F_COS, sim_F_JAC, get_tool_label
+
+
+def get_scheme(name: str) -> callable:
+    """
+    Get the classification scheme from its short name, i.e. one of 'bm', 'ha' or 'knnK', 
+    where K is an integer, 0 < K <= 300.
+    """
+    if name == "bm":
+        return classify_best_match
+    elif name == "ha":
+        return classify_highest_average
+    elif name.startswith("knn") and name[3:].isdigit():
+        k = int(name[3:])
+        if 0 < k <= 300:
+            return partial(classify_KNN, k=k)
+        raise ValueError(f"K in knnK must be an integer between 1 and 300. Got {k}.")
+    raise ValueError(f"Invalid classification scheme: {name}. Must be one of ['bm', 'ha', 'knnK'], where K is an integer, 0 < K <= 300.")
 
 
 def get_classification_label(scheme: callable, tool_label: str):
-    match scheme.__name__:
+    scheme_name = getattr(scheme, "func", scheme).__name__  # Unwrap partial (e.g. KNN with a given K)
+    match scheme_name:
         case "classify_best_match":
             return f"{tool_label}_best_match"
         case "classify_highest_average":
             return f"{tool_label}_highest_average"
         case "classify_KNN":
-            return f"{tool_label}_KNN"
+            k = scheme.keywords.get("k") if isinstance(scheme, partial) else None
+            return f"{tool_label}_KNN{k}" if k else f"{tool_label}_KNN"
+        case _:
+            print("Unknown scheme: " + scheme_name)
+            return f"{tool_label}_unknown"
+
+def get_sim_c(sim_type: Literal["NCD", "COS", "JAC"], func: callable, executor: concurrent.futures.Executor = None) -> callable:
+    """
+    Get the similarity function sim_c(validation_file, training_file) used by the classification schemes.
+    """
+    match sim_type:
+        case "NCD":
+            # Compress all (validation, training) pairs in parallel up front. The compressed lengths 
+            # are cached, so they are shared with other schemes and runs using the same compressor.
+            pairs = [(file, training_file) for file in data.validation_files for training_file in data.training_files]
+            files = [(file,) for file in data.validation_files + data.training_files]
+            compute_complengths(files + pairs, func, executor)
+            return lambda f, sf: sim_C_NCD_single(f, sf, func)
+        case "COS" | "JAC":
+            # Compute all (validation, training) similarities as a single matrix product
+            sim_F = sim_F_COS if sim_type == "COS" else sim_F_JAC
+            sim_matrix = sim_F(data.validation_files, func, data.training_files)
+            validation_idx = {file: i for i, file in enumerate(data.validation_files)}
+            training_idx = {file: i for i, file in enumerate(data.training_files)}
+            return lambda f, sf: sim_matrix[validation_idx[f], training_idx[sf]]
         case _:
-            print("Unknown scheme: " + scheme.__name__)
-            return f"{tool_label}_KNN"  # TODO: Fix KNN is currently passed as a lambda
+            raise ValueError(f"Classification is not supported for similarity type: {sim_type}")
 
-def classify_files(scheme: callable, compressors: list[callable]):    
-    for comp in compressors:
-        label = get_classification_label(scheme, get_tool_label("NCD", comp))
+def classify_files(scheme: callable, funcs: list[callable], sim_type: Literal["NCD", "COS", "JAC"] = "NCD", executor: concurrent.futures.Executor = None):    
+    for func in funcs:
+        label = get_classification_label(scheme, get_tool_label(sim_type, func))
+        sim_c = get_sim_c(sim_type, func, executor)
         for file in data.validation_files:
-            classification = scheme(file, lambda f, sf: sim_C_NCD_single(f, sf, comp))
+            classification = scheme(file, sim_c)
             # print(f"File: {file.name}, Actual group: {file.group}, Classification: {classification}")
             data.classification_per_group_per_tool[label][file.group][classification] += 1            
 
@@ -2,9 +2,10 @@ import argparse
 from functools import partial
 import data
 import plots
-from similarity import get_tool_label, sim_C_ICD, sim_C_NCD
-from classification import classify_best_match, classify_files, classify_highest_average, classify_KNN
+from similarity import get_tool_label, sim_C_ICD, sim_C_NCD, sim_F_COS, sim_F_JAC
+from classification import classify_best_match, classify_files, classify_highest_average, classify_KNN, get_scheme
 import compressors as comp
+import features as feat
 
 
 class CompFuncAction(argparse.Action):
@@ -18,22 +19,25 @@ class CompFuncAction(argparse.Action):
         setattr(namespace, self.dest, compressors)
 
 
+class FeatFuncAction(argparse.Action):
+    def __call__(self, parser, namespace, values, option_string=None):
+        features = []
+        for value in values:
+            if hasattr(feat, f"feat_{value}"):
+                features.append(getattr(feat, f"feat_{value}"))
+            else:
+                raise argparse.ArgumentError(self, f"Unknown feature: {value}")
+        setattr(namespace, self.dest, features)
+
+
 class SchemeAction(argparse.Action):
     def __call__(self, parser, namespace, values: list[str], option_string=None):
         schemes = []
         for scheme in values:
-            if scheme == "bm":
-                schemes.append(classify_best_match)
-            elif scheme == "ha":
-                schemes.append(classify_highest_average)
-            elif scheme.startswith("knn") and scheme[3:].isdigit():
-                k = int(scheme[3:])
-                if 0 < k <= 300:
-                    schemes.append(lambda file, sim_c: classify_KNN(file, sim_c, k))
-                else:
-                    raise argparse.ArgumentError(self, f"K in knnK must be an integer between 1 and 300. Got {k}.")
-            else:
-                raise argparse.ArgumentError(self, f"Invalid classification scheme: {scheme}. Must be one of ['bm', 'ha', 'knnK'], where K is an integer, 0 < K <= 300.")
+            try:
+                schemes.append(get_scheme(scheme))
+            except ValueError as e:
+                raise argparse.ArgumentError(self, str(e))
         setattr(namespace, self.dest, schemes)
 
 
@@ -53,8 +57,17 @@ def parse_args(args: str=None):
                         type=str, 
                         nargs="+", 
                         choices=["bzip2", "gzip", "zlib", "zstandard", "zstd"], 
-                        required=True, 
-                        action=CompFuncAction)
+                        default=[],
+                        action=CompFuncAction,
+                        help="Compressors used by the compression-based similarity tools (-NCD, -ICD).")
+    parser.add_argument("-f", "--features",
+                        type=str,
+                        nargs="+",
+                        choices=["tokens", "bytes"],
+                        default=[],
+                        action=FeatFuncAction,
+                        help="Features used by the feature-based similarity tools (-COS, -JAC). \
+                              'tokens' is Java token 3-grams and 'bytes' is byte 4-grams, both hashed into sparse vectors.")
     parser.add_argument("-nclfy", "--num-classification-files",
                         type=int,
                         nargs=3,
@@ -67,7 +80,7 @@ def parse_args(args: str=None):
                         nargs="+",
                         metavar={"bm", "ha", "knn{1-300}"},
                         choices=["bm", "ha"] + [f"knn{i}" for i in range(1, 301)],
-                        default=[classify_best_match, classify_highest_average, (lambda f, c: classify_KNN(f, c, k=10))],
+                        default=[classify_best_match, classify_highest_average, partial(classify_KNN, k=10)],
                         action=SchemeAction,
                         help="Classification schemes to use for the classification of files. Choose one or more classification schemes from {'bm', 'knn[1-300]', 'ha'}.\
                               Where 'bm' is 'Best Match', 'knn[1-300]' is 'K-Nearest Neighbors' with 1 <= K <= 300 files, and 'ha' is 'highest average'.\
@@ -80,6 +93,12 @@ def parse_args(args: str=None):
     parser.add_argument("-ICD", 
                         action="store_true", 
                         help="Use Inclusion Compression Divergence (ICD) for similarity calculation.")
+    parser.add_argument("-COS", 
+                        action="store_true", 
+                        help="Use cosine similarity of feature counts for similarity calculation.")
+    parser.add_argument("-JAC", 
+                        action="store_true", 
+                        help="Use Jaccard similarity of feature sets for similarity calculation.")
     parser.add_argument("-PH", "--plot-heatmaps", 
                         action="store_true", 
                         help="Generate heatmaps of the similarity matrices.")
@@ -107,9 +126,13 @@ def parse_args(args: str=None):
     if not 0 < args.num_files <= 300:
         raise argparse.ArgumentError(None, f"Number of files per directory must be between 1 and 300. Got {args.num_files}.")
         
-    required_flags = ["-NCD", "-ICD"]
-    if not (args.ICD or args.NCD):
+    required_flags = ["-NCD", "-ICD", "-COS", "-JAC"]
+    if not (args.ICD or args.NCD or args.COS or args.JAC):
         raise argparse.ArgumentError(None, f"At least one of the following flags must be set: {required_flags}")
+    if (args.NCD or args.ICD) and not args.compressors:
+        raise argparse.ArgumentError(None, "At least one compressor must be specified with -c when using -NCD or -ICD.")
+    if (args.COS or args.JAC) and not args.features:
+        raise argparse.ArgumentError(None, "At least one feature must be specified with -f when using -COS or -JAC.")
     
     return args
     
@@ -129,6 +152,16 @@ def run():
         for comp in args.compressors:
             sim_matrix = sim_C_ICD(data.sample_files, comp)
             data.sim_matrices[get_tool_label("ICD", comp)] = sim_matrix
+    
+    if args.COS:
+        for feature in args.features:
+            sim_matrix = sim_F_COS(data.sample_files, feature)
+            data.sim_matrices[get_tool_label("COS", feature)] = sim_matrix
+    
+    if args.JAC:
+        for feature in args.features:
+            sim_matrix = sim_F_JAC(data.sample_files, feature)
+            data.sim_matrices[get_tool_label("JAC", feature)] = sim_matrix
             
     if args.cluster:
         for sim_id, sim_matrix in data.sim_matrices.items():
@@ -146,6 +179,10 @@ def run():
         data.load_classification_data(*args.num_classification_files)
         for scheme in args.schemes:
             classify_files(scheme, args.compressors)
+            if args.COS:
+                classify_files(scheme, args.features, "COS")
+            if args.JAC:
+                classify_files(scheme, args.features, "JAC")
             print(data.classification_per_group_per_tool)
             
     if args.plot_classification:
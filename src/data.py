@@ -42,7 +42,7 @@ sample_files: list[File] = None
 training_files: list[File] = None
 validation_files: list[File] = None
 
-classification_per_group_per_tool: dict = defaultdict(lambda: np.zeros((NUM_SAMPLE_DIRS, NUM_SAMPLE_DIRS), dtype=int))
+classification_per_group_per_tool: dict = defaultdict(lambda: np.zeros((NUM_CLASSIFICATION_DIRS, NUM_CLASSIFICATION_DIRS), dtype=int))
 sim_matrices: dict[str, SimMatrix] = {}
 
     
@@ -0,0 +1,41 @@
+import zlib
+
+import javalang
+import numpy as np
+
+from minify import tokenize_java
+
+NUM_FEATURE_BITS = 20  # Feature vectors have 2**20 hashed buckets
+_HASH_BASE = 1099511628211  # FNV-1 64-bit prime
+_HASH_MIX = 0x9E3779B97F4A7C15  # 2**64 / golden ratio (Fibonacci hashing)
+
+
+def _hash_ngrams(ids: np.ndarray, n: int) -> np.ndarray:
+    """
+    Hashes all n-grams of a sequence of (uint64) ids into the range [0, 2**NUM_FEATURE_BITS).
+    Returns an array with a bucket index per n-gram.
+    """
+    if len(ids) < n:
+        return np.zeros(0, dtype=np.int64)
+    powers = np.array([pow(_HASH_BASE, k, 2**64) for k in range(n)], dtype=np.uint64)
+    windows = np.lib.stride_tricks.sliding_window_view(ids, n)
+    hashes = (windows * powers).sum(axis=1, dtype=np.uint64)  # Wraps around modulo 2**64
+    return ((hashes * np.uint64(_HASH_MIX)) >> np.uint64(64 - NUM_FEATURE_BITS)).astype(np.int64)
+
+
+def feat_tokens(data: bytes, n: int=3) -> np.ndarray:
+    if n < 1:
+        raise ValueError("N-gram size out of range. tokens accepts n-gram sizes of at least 1.")
+    src = data.decode("utf-8-sig", errors="replace")  # utf-8-sig strips a leading BOM, which javalang rejects
+    try:
+        tokens = tokenize_java(src)
+    except javalang.tokenizer.LexerError:
+        tokens = src.split()  # Fall back to whitespace tokens, so one file javalang cannot tokenize does not abort a run
+    token_ids = np.array([zlib.crc32(token.encode()) for token in tokens], dtype=np.uint64)
+    return _hash_ngrams(token_ids, n)
+
+def feat_bytes(data: bytes, n: int=4) -> np.ndarray:
+    if n < 1:
+        raise ValueError("N-gram size out of range. bytes accepts n-gram sizes of at least 1.")
+    byte_ids = np.frombuffer(data, dtype=np.uint8).astype(np.uint64)
+    return _hash_ngrams(byte_ids, n)
@@ -2,6 +2,13 @@ import javalang
 
 
 
+def tokenize_java(src: str) -> list[str]:
+    """
+    Returns the values of the Java tokens in the source code (whitespace and comments are skipped).
+    """
+    return [token.value for token in javalang.tokenizer.tokenize(src)]
+
+
 def minify_java(src: str) -> str:
     tokens = list(javalang.tokenizer.tokenize(src))
     # print(list(map(lambda t: f"{t.__class__.__name__} {t.value}", tokens)))
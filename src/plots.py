@@ -59,11 +59,11 @@ def create_classification_plot():
         im = ax.imshow(clfy_per_group, cmap="viridis", interpolation="nearest")
         fig.colorbar(im, ax=ax)
 
-        if data.NUM_SAMPLE_DIRS > 15:
+        if data.NUM_CLASSIFICATION_DIRS > 15:
             ax.axis("off")
         else:
-            labels = range(1, data.NUM_SAMPLE_DIRS + 1)
-            ticks = [i for i in range(data.NUM_SAMPLE_DIRS)]
+            labels = range(1, data.NUM_CLASSIFICATION_DIRS + 1)
+            ticks = [i for i in range(data.NUM_CLASSIFICATION_DIRS)]
             ax.set_xticks(ticks, labels)
             ax.set_yticks(ticks, labels)
         fig.tight_layout()
@@ -1,12 +1,16 @@
-from functools import partial
 from typing import Callable, Literal
 import concurrent.futures
+import os
+import time
 
 import numpy as np
+import scipy.sparse as sp
 
 from data import File, SimMatrix
+from features import NUM_FEATURE_BITS
 
 type compFunc = Callable[[bytes], bytes]
+type featFunc = Callable[[bytes], np.ndarray]
 
 
 def _complenght(data: bytes, compressor: compFunc) -> int:
@@ -16,45 +20,144 @@ def _complenght(data: bytes, compressor: compFunc) -> int:
     return len(compressor(data))
 
 
-# helper to compute compressed lengths for a batch of pairs
-def _batch_complengths(pairs: list[tuple[int,int,bytes]], compressor: compFunc) -> list[tuple[int,int,int]]:
+def _timed_complenght(data: bytes, compressor: compFunc) -> tuple[int, float]:
+    """
+    Returns the length of the compressed data and the time (seconds) spent compressing it.
+    """
+    start = time.perf_counter()
+    length = _complenght(data, compressor)
+    return length, time.perf_counter() - start
+
+
+# helper to compute compressed lengths (and compression times) for a batch of inputs
+def _batch_complengths(batch: list[tuple[int, bytes]], compressor: compFunc) -> list[tuple[int, tuple[int, float]]]:
     results = []
-    for i, j, data in pairs:
-        results.append((i, j, len(compressor(data))))
+    for idx, data in batch:
+        results.append((idx, _timed_complenght(data, compressor)))
     return results
 
 
-def sim_C_NCD(files: list[File], compressor: compFunc) -> SimMatrix:
+# Compressed lengths shared by all similarity tools and runs in this process, together with the 
+# time spent compressing each input, such that the cold cost of a tool can be computed from the cache.
+# Keyed by (compressor name, path of file 1[, path of file 2]) where a pair key 
+# refers to the concatenation of the two files in that order.
+_complength_cache: dict[tuple, tuple[int, float]] = {}
+
+
+def _cache_key(compressor: compFunc, *files: File) -> tuple:
+    return (compressor.__name__, *(file.path for file in files))
+
+
+def clear_complength_cache(compressor: compFunc = None):
+    """
+    Removes the cached compressed lengths of the given compressor, or of all compressors if none is given.
+    """
+    if compressor is None:
+        _complength_cache.clear()
+    else:
+        for key in [key for key in _complength_cache if key[0] == compressor.__name__]:
+            del _complength_cache[key]
+
+
+def get_complength(compressor: compFunc, *files: File) -> int:
+    """
+    Returns the compressed length of the concatenation of the given files. 
+    The result is cached, so each input is only compressed once per compressor.
+    """
+    key = _cache_key(compressor, *files)
+    if key not in _complength_cache:
+        _complength_cache[key] = _timed_complenght(b"".join(file.get_bytes() for file in files), compressor)
+    return _complength_cache[key][0]
+
+
+def get_complength_seconds(inputs: list[tuple[File, ...]], compressor: compFunc) -> float:
+    """
+    Returns the total time (seconds) spent compressing the unique inputs (tuples of files to be concatenated), 
+    i.e. the cost of compressing them one at a time from an empty cache. All inputs must be cached.
+    """
+    keys = {_cache_key(compressor, *files) for files in inputs}
+    return sum(_complength_cache[key][1] for key in keys)
+
+
+def compute_complengths(inputs: list[tuple[File, ...]], compressor: compFunc, executor: concurrent.futures.Executor = None):
+    """
+    Computes the compressed lengths of all inputs (tuples of files to be concatenated) 
+    which are not already cached. The work is split into batches and run in parallel 
+    on the given executor. If no executor is given, a temporary ProcessPoolExecutor is used.
+    """
+    # Unique inputs (in input order) which have not been compressed before
+    unique_inputs = {_cache_key(compressor, *files): files for files in inputs}
+    missing = [files for key, files in unique_inputs.items() if key not in _complength_cache]
+    if not missing:
+        return
+    
+    batch_size = 20
+    max_pending_batches = 4 * (os.cpu_count() or 1)
+    
+    def batches():
+        # Concatenate the bytes of a batch only when it is about to be submitted
+        for k in range(0, len(missing), batch_size):
+            yield [(idx, b"".join(file.get_bytes() for file in missing[idx])) for idx in range(k, min(k + batch_size, len(missing)))]
+    
+    def store(futures):
+        for future in futures:
+            for idx, length_and_seconds in future.result():
+                _complength_cache[_cache_key(compressor, *missing[idx])] = length_and_seconds
+    
+    def collect(executor: concurrent.futures.Executor):
+        # Keep a bounded number of batches in flight, so at most that many batches of bytes are held in memory
+        pending = set()
+        for batch in batches():
+            if len(pending) >= max_pending_batches:
+                done, pending = concurrent.futures.wait(pending, return_when=concurrent.futures.FIRST_COMPLETED)
+                store(done)
+            pending.add(executor.submit(_batch_complengths, batch, compressor))
+        store(concurrent.futures.wait(pending).done)
+    
+    if executor is None:
+        with concurrent.futures.ProcessPoolExecutor() as executor:
+            collect(executor)
+    else:
+        collect(executor)
+
+
+def get_NCD_inputs(files: list[File]) -> list[tuple[File, ...]]:
+    """
+    Returns the inputs compressed by NCD: All individual files and all pairs of files (upper triangle).
+    """
+    pairs = [(files[i], files[j]) for i in range(len(files)) for j in range(i, len(files))]
+    return [(file,) for file in files] + pairs
+
+
+def get_ICD_inputs(files: list[File]) -> list[tuple[File, ...]]:
+    """
+    Returns the inputs compressed by ICD: All individual files and all ordered pairs of files.
+    """
+    pairs = [(file1, file2) for file1 in files for file2 in files]
+    return [(file,) for file in files] + pairs
+
+
+def sim_C_NCD(files: list[File], compressor: compFunc, executor: concurrent.futures.Executor = None) -> SimMatrix:
     """
     Computes the pairwise similarity of a list of files using Normalized Compression Distance (NCD) with the specified compressor.
     First parameter is a list of File objects.
     Second parameter is a compressor function.
+    Optional third parameter is the executor used for the compression work (see compute_complengths).
     Returns a similarity matrix.
     """
     
     def get_all_compressed_lengths(files: list[File], compressor: compFunc):
+        # Compress all inputs not already cached
+        compute_complengths(get_NCD_inputs(files), compressor, executor)
+        
         # Compressed lengths of all individual files (1D array)
-        compressed_file_lengths = list(map(lambda file: _complenght(file.get_bytes(), compressor), files))
+        compressed_file_lengths = [get_complength(compressor, file) for file in files]
         
         # Compressed lengths of all pairs of files (2D matrix)
         compressed_pair_lengths = np.zeros((len(files), len(files)), dtype=int)
-        
-        # Batch-based parallel computation of pairwise compressed lengths
-        batch_size = 20
-        
-        # prepare all pairs
-        pairs = [(i, j, files[i].get_bytes() + files[j].get_bytes())
-                 for i in range(len(files)) for j in range(i, len(files))]
-        batches = [pairs[k:k+batch_size] for k in range(0, len(pairs), batch_size)]
-        with concurrent.futures.ProcessPoolExecutor() as executor:
-            futures = [executor.submit(_batch_complengths, batch, compressor) for batch in batches]
-            for future in concurrent.futures.as_completed(futures):
-                for i, j, val in future.result():
-                    compressed_pair_lengths[i, j] = val
-                    if i != j:
-                        compressed_pair_lengths[j, i] = val
-        # Alternative to the above 2 lines (similar running time):
-        # compressed_pair_lengths += compressed_pair_lengths.T - np.diag(np.diag(compressed_pair_lengths))  # Make it symmetric (copy upper triangle to lower triangle)
+        for i in range(len(files)):
+            for j in range(i, len(files)):
+                compressed_pair_lengths[i, j] = compressed_pair_lengths[j, i] = get_complength(compressor, files[i], files[j])
         
         return compressed_file_lengths, compressed_pair_lengths
         
@@ -77,42 +180,131 @@ def sim_C_NCD_single(file1: File, file2: File, compressor: compFunc) -> float:
     Computes the Normalized Compression Distance (NCD) between two files using the specified compressor.
     Returns a similarity score between 0 and 1.
     """
-    x = file1.get_bytes()
-    y = file2.get_bytes()
-    
-    Zx = _complenght(x, compressor)
-    Zy = _complenght(y, compressor)
-    Zxy = _complenght(x + y, compressor)
+    Zx = get_complength(compressor, file1)
+    Zy = get_complength(compressor, file2)
+    Zxy = get_complength(compressor, file1, file2)
     
     return 1 - (Zxy - min(Zx, Zy)) / max(Zx, Zy)
 
 
-def sim_C_ICD(files: list[File], compressor: compFunc) -> SimMatrix:
+def sim_C_ICD(files: list[File], compressor: compFunc, executor: concurrent.futures.Executor = None) -> SimMatrix:
     """
     Computes the pairwise similarity of a list of files using Inclusion Compression Divergence (ICD) with the specified compressor.
-    First parameter is a list of tuples where each tuple contains the filename and the bytes representing the file content.
+    First parameter is a list of File objects.
     Second parameter is a compressor function.
-    Returns a list of tuples containing the names of the compared files and their similarity score.
+    Optional third parameter is the executor used for the compression work (see compute_complengths).
+    Returns a similarity matrix.
     """
-    def ICD(x: bytes, y: bytes, compressor: compFunc) -> float:
-        xy = x + y
-        partial_compressed_size = partial(_complenght, compressor=compressor)
-        Zx, Zy, Zxy = list(map(partial_compressed_size, [x, y, xy]))
+    def ICD(file1: File, file2: File, compressor: compFunc) -> float:
+        Zx = get_complength(compressor, file1)
+        Zy = get_complength(compressor, file2)
+        Zxy = get_complength(compressor, file1, file2)
         return (Zxy - Zy) / Zx
     
+    # Compress all inputs not already cached
+    compute_complengths(get_ICD_inputs(files), compressor, executor)
+    
     size = len(files)
     similarities = np.zeros((size, size), dtype=float)
     for i in range(len(files)):
         file1 = files[i]
         for j in range(len(files)):
             file2 = files[j]
-            sim = 1 - ICD(file1.get_bytes(), file2.get_bytes(), compressor)
+            sim = 1 - ICD(file1, file2, compressor)
             similarities[i, j] = sim
     return similarities.view(SimMatrix)
 
 
-def get_tool_label(sim_C_type: Literal["NCD", "ICD"], comp_func: compFunc) -> str:
+# Hashed n-gram features of each file and the time (seconds) spent computing them, 
+# keyed by (feature function name, file path).
+_features_cache: dict[tuple, tuple[np.ndarray, float]] = {}
+
+
+def clear_features_cache(feature: featFunc = None):
+    """
+    Removes the cached features of the given feature function, or of all feature functions if none is given.
+    """
+    if feature is None:
+        _features_cache.clear()
+    else:
+        for key in [key for key in _features_cache if key[0] == feature.__name__]:
+            del _features_cache[key]
+
+
+def get_features(feature: featFunc, file: File) -> np.ndarray:
+    """
+    Returns the hashed features (bucket indices) of the file. The result is cached.
+    """
+    key = (feature.__name__, file.path)
+    if key not in _features_cache:
+        data = file.get_bytes()
+        start = time.perf_counter()
+        features = feature(data)
+        _features_cache[key] = (features, time.perf_counter() - start)
+    return _features_cache[key][0]
+
+
+def get_features_seconds(files: list[File], feature: featFunc) -> float:
+    """
+    Returns the total time (seconds) spent computing the features of the unique files, 
+    i.e. the cost of computing them from an empty cache. All files must be cached.
+    """
+    keys = {(feature.__name__, file.path) for file in files}
+    return sum(_features_cache[key][1] for key in keys)
+
+
+def _feature_matrix(files: list[File], feature: featFunc) -> sp.csr_matrix:
+    """
+    Returns a sparse matrix with a row per file holding the count of each hashed feature.
+    """
+    features = [get_features(feature, file) for file in files]
+    rows = np.repeat(np.arange(len(files)), [len(f) for f in features])
+    cols = np.concatenate(features) if features else np.zeros(0, dtype=np.int64)
+    counts = np.ones(len(cols), dtype=float)
+    return sp.csr_matrix((counts, (rows, cols)), shape=(len(files), 2**NUM_FEATURE_BITS))  # Duplicates are summed
+
+
+def sim_F_COS(files: list[File], feature: featFunc, other_files: list[File] = None) -> SimMatrix:
+    """
+    Computes the pairwise cosine similarity of the feature count vectors of a list of files.
+    First parameter is a list of File objects.
+    Second parameter is a feature function.
+    Optional third parameter is a list of File objects to compare against (columns). Defaults to the first list.
+    Returns a similarity matrix.
+    """
+    def normalize(matrix: sp.csr_matrix) -> sp.csr_matrix:
+        norms = np.sqrt(np.asarray(matrix.multiply(matrix).sum(axis=1)).ravel())
+        norms[norms == 0] = 1  # Files without features have zero similarity with everything
+        return sp.diags(1 / norms) @ matrix
+    
+    x = normalize(_feature_matrix(files, feature))
+    y = x if other_files is None else normalize(_feature_matrix(other_files, feature))
+    sim_matrix = (x @ y.T).toarray().view(SimMatrix)
+    sim_matrix.isSymmetric = other_files is None  # Cosine similarity is symmetric across the main diagonal
+    return sim_matrix
+
+
+def sim_F_JAC(files: list[File], feature: featFunc, other_files: list[File] = None) -> SimMatrix:
+    """
+    Computes the pairwise Jaccard similarity of the feature sets of a list of files.
+    First parameter is a list of File objects.
+    Second parameter is a feature function.
+    Optional third parameter is a list of File objects to compare against (columns). Defaults to the first list.
+    Returns a similarity matrix.
+    """
+    x = (_feature_matrix(files, feature) > 0).astype(float)
+    y = x if other_files is None else (_feature_matrix(other_files, feature) > 0).astype(float)
+    
+    # |A ∩ B| is the product of the binary feature matrices, |A ∪ B| = |A| + |B| - |A ∩ B|
+    intersections = (x @ y.T).toarray()
+    unions = np.add.outer(np.asarray(x.sum(axis=1)).ravel(), np.asarray(y.sum(axis=1)).ravel()) - intersections
+    sim_matrix = np.divide(intersections, unions, out=np.zeros_like(intersections), where=unions > 0).view(SimMatrix)
+    sim_matrix.isSymmetric = other_files is None  # Jaccard similarity is symmetric across the main diagonal
+    return sim_matrix
+
+
+def get_tool_label(sim_type: Literal["NCD", "ICD", "COS", "JAC"], func: compFunc | featFunc) -> str:
     """
-    Get a label for the tool based on the compressor and similarity function.
+    Get a label for the tool based on the similarity function and the compressor or feature function.
     """
-    return f"{sim_C_type}_{comp_func.__name__[5:]}"
+    return f"{sim_type}_{func.__name__[5:]}"
@@ -0,0 +1,153 @@
+from itertools import product
+from typing import Literal
+import concurrent.futures
+import os
+import time
+
+import numpy as np
+import pandas as pd
+
+import data
+from similarity import clear_complength_cache, clear_features_cache, compFunc, compute_complengths, featFunc, get_complength_seconds, get_features, get_features_seconds, get_ICD_inputs, get_NCD_inputs, get_tool_label, sim_C_ICD, sim_C_NCD, sim_F_COS, sim_F_JAC
+from classification import classify_files, get_classification_label, get_scheme
+
+
+SIM_C_FUNCS = {"NCD": sim_C_NCD, "ICD": sim_C_ICD}
+SIM_F_FUNCS = {"COS": sim_F_COS, "JAC": sim_F_JAC}
+SIM_C_INPUTS = {"NCD": get_NCD_inputs, "ICD": get_ICD_inputs}
+CLASSIFICATION_METRICS = ["NCD", "COS", "JAC"]
+FSCORE_THRESHOLDS = np.arange(0.1, 1, 0.02)
+
+
+def clear_caches(func: compFunc | featFunc):
+    """
+    Clear the cached compressed lengths or features of the compressor or feature function.
+    """
+    clear_complength_cache(func)
+    clear_features_cache(func)
+
+
+def get_sim_matrix(metric: str, func: compFunc | featFunc, files: list[data.File], executor: concurrent.futures.Executor) -> tuple[data.SimMatrix, float]:
+    """
+    Compute the similarity matrix of the files with the given tool (metric and compressor or feature function).
+    Returns the tuple (similarity matrix, seconds), where seconds is the cost of computing the matrix from an 
+    empty cache: The cached compression/feature time of every input the tool needs plus the time spent on 
+    computing the matrix from those inputs. Hence the cost does not depend on what earlier runs have cached.
+    """
+    # Compress (or compute features of) all inputs not already cached, and add up the cached time of all inputs
+    if metric in SIM_C_FUNCS:
+        inputs = SIM_C_INPUTS[metric](files)
+        compute_complengths(inputs, func, executor)
+        input_seconds = get_complength_seconds(inputs, func)
+    else:
+        for file in files:
+            get_features(func, file)
+        input_seconds = get_features_seconds(files, func)
+    
+    # Compute the matrix from the cached inputs
+    start = time.perf_counter()
+    if metric in SIM_C_FUNCS:
+        sim_matrix = SIM_C_FUNCS[metric](files, func, executor)
+    else:
+        sim_matrix = SIM_F_FUNCS[metric](files, func)
+    return sim_matrix, input_seconds + time.perf_counter() - start
+
+
+def get_best_fscore(sim_matrix: data.SimMatrix) -> tuple[float, float]:
+    """
+    Calculate the F-score of the similarity matrix for each threshold in FSCORE_THRESHOLDS.
+    Returns the tuple (best F-score, threshold of the best F-score).
+    """
+    # Use upper triangle of the matrix for symmetric matrices (same as the F-scores plot)
+    matrix = np.triu(sim_matrix) if sim_matrix.isSymmetric else sim_matrix
+    fscores = [data.get_fscore(matrix, t) for t in FSCORE_THRESHOLDS]
+    best = int(np.argmax(fscores))
+    return float(fscores[best]), float(FSCORE_THRESHOLDS[best])
+
+
+def get_accuracy(scheme: callable, metric: str, func: compFunc | featFunc, executor: concurrent.futures.Executor) -> float:
+    """
+    Classify the validation files with the given scheme and tool (metric and compressor or feature function).
+    Returns the fraction of validation files classified as their actual group.
+    """
+    label = get_classification_label(scheme, get_tool_label(metric, func))
+    data.classification_per_group_per_tool.pop(label, None)  # Reset counts from previous runs
+    classify_files(scheme, [func], metric, executor)
+    clfy_per_group = data.classification_per_group_per_tool[label]
+    return float(np.trace(clfy_per_group) / np.sum(clfy_per_group))
+
+
+def run_sweep(num_dirs: list[int],
+              num_files: list[int],
+              compressors: list[compFunc],
+              metrics: list[Literal["NCD", "ICD", "COS", "JAC"]],
+              schemes: tuple[str, ...] = (),
+              num_classification_files: tuple[int, int, int] = (5, 15, 15),
+              max_workers: int = None,
+              features: tuple[featFunc, ...] = ()) -> pd.DataFrame:
+    """
+    Run every combination of (num_dirs, num_files, tool) in the grid, where a tool is a metric 
+    combined with a compressor (NCD, ICD) or a feature function (COS, JAC), and classify the 
+    classification files with every scheme (ICD does not support classification).
+
+    The runs are executed one at a time in this process, while all compression work is
+    scheduled on a single shared ProcessPoolExecutor with at most 'max_workers' workers
+    (default: number of CPUs). Compressed lengths and features are cached across runs, so 
+    inputs shared between runs, metrics and schemes (e.g. the upper triangle of NCD reused by 
+    ICD, or the first files of each directory shared by all grid points) are only computed once. 
+    The runs are grouped by compressor/feature function, and the cache of a function is cleared 
+    once all of its runs are done, since no other function can reuse it.
+
+    Returns a table with a row per (num_dirs, num_files, metric, compressor/feature, scheme).
+    The 'seconds' column is the cost of computing the similarity matrix from an empty cache, 
+    i.e. the sum of the cached compression/feature time of every input the tool needs (as if 
+    computed one at a time) plus the time spent computing the matrix from those inputs.
+    """
+    for metric in metrics:
+        if metric not in SIM_C_FUNCS | SIM_F_FUNCS:
+            raise ValueError(f"Invalid metric: {metric}. Must be one of {list(SIM_C_FUNCS | SIM_F_FUNCS)}.")
+    
+    if data.JAVA250_DATA is None:
+        data.load_java250_data()
+
+    # Group the tools by compressor/feature function, such that each function's cached work can be cleared when it is done
+    funcs = list(dict.fromkeys([*compressors, *features]))
+    tools_per_func = {func: [metric for metric in metrics if func in (compressors if metric in SIM_C_FUNCS else features)] for func in funcs}
+    
+    rows = []
+    with concurrent.futures.ProcessPoolExecutor(max_workers=max_workers or os.cpu_count()) as executor:
+        if schemes:
+            data.load_classification_data(*num_classification_files)
+        
+        for func, func_metrics in tools_per_func.items():
+            accuracies: dict[tuple[str, str], float] = {}  # Classification does not depend on num_dirs and num_files
+            if schemes:
+                for metric, scheme_name in product(func_metrics, schemes):
+                    if metric in CLASSIFICATION_METRICS:
+                        print(f"Classifying: {get_tool_label(metric, func)} {scheme_name}")
+                        accuracies[(metric, scheme_name)] = get_accuracy(get_scheme(scheme_name), metric, func, executor)
+
+            for (n_dirs, n_files), metric in product(product(num_dirs, num_files), func_metrics):
+                data.load_sample_data(n_dirs, n_files)
+                tool_label = get_tool_label(metric, func)
+                print(f"Running: {n_dirs} {n_files} {tool_label}")
+                sim_matrix, seconds = get_sim_matrix(metric, func, data.sample_files, executor)
+                fscore, threshold = get_best_fscore(sim_matrix)
+                for scheme_name in schemes or [None]:
+                    rows.append({
+                        "num_dirs": n_dirs,
+                        "num_files": n_files,
+                        "tool": tool_label,
+                        "metric": metric,
+                        "compressor": func.__name__[5:] if metric in SIM_C_FUNCS else None,
+                        "feature": func.__name__[5:] if metric in SIM_F_FUNCS else None,
+                        "fscore": fscore,
+                        "threshold": threshold,
+                        "seconds": seconds,
+                        "scheme": scheme_name,
+                        "accuracy": accuracies.get((metric, scheme_name), np.nan),
+                    })
+            
+            clear_caches(func)
+
+    return pd.DataFrame(rows)